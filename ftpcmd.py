@@ -9,17 +9,480 @@ FTP文件传输工具
 VERSION = "1.0.1"
 
 import os
+import posixpath
+import re
+import stat
 import sys
 import argparse
+import calendar
 import ftplib
+import itertools
 import json
+import queue
+import socket
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:
+    # Windows没有fcntl，splice快速路径本身也仅在Linux上可用
+    fcntl = None
+
+try:
+    import pycurl
+except ImportError:
+    # pycurl为可选依赖，未安装时只能使用ftplib传输
+    pycurl = None
+
+# 数据连接每次读写的默认块大小（sendfile、splice、recv_into每次调用处理的最大字节数）
+BLOCKSIZE = 1024 * 1024
+# 下载过程中临时文件的后缀，下载完整后改名为目标文件
+PART_SUFFIX = '.part'
+# 控制连接读缓冲区大小，流水线发送多条命令时一次读入多条响应
+CONTROL_BUFFER_SIZE = 16384
+# 后台线程刷新进度的时间间隔（秒）
+PROGRESS_INTERVAL = 0.1
+# 待传输数据少于该大小时不启动刷新线程，只输出最终进度
+PROGRESS_THREAD_MIN_BYTES = 1024 * 1024
+# 小于该大小的文件上传时不探测远程大小、不断点续传
+DEFAULT_RESUME_THRESHOLD = 1024 * 1024
+# 并发传输时待处理任务队列的容量
+TASK_QUEUE_SIZE = 1024
+# 目录传输的默认并发连接数
+DEFAULT_WORKERS = 4
+# 数据连接的默认TCP收发缓冲区大小，0表示不设置：Linux上显式设置会关闭缓冲区自动调节，
+# 且实际大小受 /proc/sys/net/core/{r,w}mem_max 限制（默认约208KB），反而限制高延迟链路的吞吐量
+DEFAULT_TCP_BUFFER_SIZE = 0
+# encoding为'auto'且服务器不接受OPTS UTF8 ON时使用的编码
+AUTO_ENCODING_FALLBACK = 'gbk'
+# 非splice下载时，剩余数据不少于该大小才使用独立的写文件线程
+WRITER_THREAD_MIN_BYTES = 8 * 1024 * 1024
+# 独立写文件线程与接收线程之间轮转的缓冲区个数
+WRITE_BUFFER_COUNT = 4
+# 流水线每批发送的最大命令数，避免未读取的响应填满套接字缓冲区导致双方互相等待
+PIPELINE_BATCH_SIZE = 64
+# 控制连接的keepalive参数：空闲多少秒后开始探测、探测间隔（秒）、连续失败多少次判定断开
+KEEPALIVE_IDLE = 60
+KEEPALIVE_INTERVAL = 20
+KEEPALIVE_COUNT = 3
+# Unix风格LIST输出行：权限 链接数 属主 属组 大小 月 日 时间/年 文件名
+_LIST_RE = re.compile(r'^(\S)\S*\s+\S+\s+\S+\s+\S+\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+) (.+)$')
+# Windows/IIS风格LIST输出行：日期 时间 <DIR>或大小 文件名
+_DOS_LIST_RE = re.compile(r'^(\d{2}-\d{2}-\d{2,4})\s+(\d{1,2}:\d{2}[AaPp][Mm])\s+(<DIR>|\d+)\s+(.+)$')
+
+
+def _write_all(fd: int, data) -> None:
+    """
+    将数据完整写入文件描述符，处理os.write部分写入的情况
+    
+    Args:
+        fd: 文件描述符
+        data: 待写入的数据
+    """
+    written = os.write(fd, data)
+    if written < len(data):
+        view = memoryview(data)[written:]
+        while view:
+            view = view[os.write(fd, view):]
+
+
+def _fadvise(fd: int, advice: str) -> None:
+    """
+    向内核提示文件的访问方式，平台不支持posix_fadvise时忽略
+    
+    Args:
+        fd: 文件描述符
+        advice: os模块中的POSIX_FADV_*常量名
+    """
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+
+def _unwrap_tls(conn) -> None:
+    """
+    TLS数据连接正常结束时先发送close_notify再关闭，与ftplib的storbinary/retrbinary一致；
+    部分服务器（如vsftpd）据此判断数据连接是否被截断
+    
+    Args:
+        conn: 数据连接，普通套接字时不做任何操作
+    """
+    if hasattr(conn, 'unwrap'):
+        conn.unwrap()
+
+
+def _walk_files(local_dir: str, remote_dir: str):
+    """
+    基于os.scandir深度优先遍历本地目录，直接产出本地路径与远程路径的对应关系
+    
+    与os.walk一样不进入指向目录的符号链接；目录条目之后紧跟其中的文件，再依次是各子目录。
+    远程路径由目录前缀直接拼接条目名得到，不经过relpath/join/replace等转换，
+    条目名一并产出，调用方无需再从路径中拆分；使用显式栈而不是递归生成器，
+    每个条目不必逐层经过各级生成器传递，目录很深时也不受递归深度限制
+    
+    Args:
+        local_dir: 本地目录路径
+        remote_dir: 对应的远程目录路径
+        
+    Yields:
+        tuple: (本地路径, 远程路径, 条目名, 是否为子目录, 文件的stat结果)，子目录条目的stat结果为None；
+            非普通文件的条目为其自身（不跟随符号链接）的stat结果，无法stat的文件条目为None
+    """
+    stack = [(local_dir, remote_dir, None)]
+    while stack:
+        current_dir, current_remote, name = stack.pop()
+        if name is not None:
+            yield current_dir, current_remote, name, True, None
+        
+        remote_prefix = current_remote.rstrip('/') + '/'
+        subdirs = []
+        try:
+            it = os.scandir(current_dir)
+        except OSError as e:
+            print(f"无法读取本地目录: {current_dir}: {e}")
+            continue
+        try:
+            with it:
+                for entry in it:
+                    # 单个条目出错（权限不足、遍历期间被删除等）不影响同一目录中的其他条目；
+                    # 出错的条目仍然产出，由上传时报告失败并计入失败数
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirs.append(entry)
+                            continue
+                        if entry.is_file():
+                            # DirEntry缓存了stat结果，上传时无需再次stat
+                            entry_stat = entry.stat()
+                        else:
+                            # 断开的符号链接、套接字、FIFO等无法上传
+                            entry_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        entry_stat = None
+                    yield entry.path, remote_prefix + entry.name, entry.name, False, entry_stat
+        except OSError as e:
+            # 读取目录中途出错时，已列出的子目录仍然继续遍历
+            print(f"无法读取本地目录: {current_dir}: {e}")
+        
+        # 逆序入栈，子目录按列出的顺序出栈
+        for entry in reversed(subdirs):
+            stack.append((entry.path, remote_prefix + entry.name, entry.name))
+
+
+def _walk_dirs(local_dir: str, remote_dir: str):
+    """
+    只遍历本地目录树中的子目录，产出对应的远程目录路径，父目录先于子目录产出
+    
+    文件条目只根据DirEntry的类型信息跳过，不需要stat，遍历代价远小于_walk_files
+    
+    Args:
+        local_dir: 本地目录路径
+        remote_dir: 对应的远程目录路径
+        
+    Yields:
+        str: 远程目录路径
+    """
+    stack = [(local_dir, remote_dir.rstrip('/') + '/')]
+    while stack:
+        current_dir, remote_prefix = stack.pop()
+        try:
+            with os.scandir(current_dir) as it:
+                subdirs = [entry for entry in it if entry.is_dir() and not entry.is_symlink()]
+        except OSError:
+            # 无法读取的目录由_walk_files报告
+            continue
+        
+        for entry in reversed(subdirs):
+            stack.append((entry.path, remote_prefix + entry.name + '/'))
+        for entry in subdirs:
+            yield remote_prefix + entry.name
+
+
+def _parse_mlst(resp: str) -> dict:
+    """
+    解析MLST命令的响应
+    
+    Args:
+        resp: MLST的多行响应，事实行形如 " type=file;size=123;modify=...; /path"
+        
+    Returns:
+        dict: {'type': 'dir'或'file', 'size': 文件大小(未知时为None)}
+    """
+    lines = resp.splitlines()
+    fact_line = next((line for line in lines if line.startswith(' ')), lines[1] if len(lines) > 1 else '')
+    facts = {}
+    for fact in fact_line.strip().partition(' ')[0].split(';'):
+        key, _, value = fact.partition('=')
+        if key:
+            facts[key.lower()] = value
+    
+    entry_type = facts.get('type', '').lower()
+    size = facts.get('size')
+    return {
+        'type': 'dir' if entry_type in ('dir', 'cdir', 'pdir') else 'file',
+        'size': int(size) if size and size.isdigit() else None,
+    }
+
+
+def _parse_time_val(value: str):
+    """
+    解析MDTM响应和MLSD modify事实中的时间值
+    
+    Args:
+        value: 形如 "20250828162319" 或带小数秒的 "20250828162319.123"
+        
+    Returns:
+        int: 远程文件修改时间的Unix时间戳（时间值使用UTC），无法解析时返回None
+    """
+    value = value.strip()[:14]
+    try:
+        return calendar.timegm(time.strptime(value, '%Y%m%d%H%M%S'))
+    except ValueError:
+        return None
+
+
+def _abs_dir(remote_dir: str):
+    """
+    规范化远程绝对路径，用于比较工作目录
+    
+    Args:
+        remote_dir: 远程目录路径
+        
+    Returns:
+        str: 规范化的绝对路径，相对路径返回None
+    """
+    if not remote_dir.startswith('/'):
+        return None
+    return posixpath.normpath(remote_dir).replace('//', '/')
+
+
+class _ProgressReporter:
+    """
+    在后台线程中定时输出传输进度
+    
+    传输线程只需累加done，格式化与终端输出都由后台线程完成，不占用数据收发的热路径；
+    输出不是终端（如重定向到文件）时不做定时刷新，只在结束时输出一次最终进度；
+    total为None时只输出计数，用于总数未知的场合（如目录传输中已完成的文件数），否则同时输出平均速度；
+    待传输的数据很少时不启动后台线程，串行传输大量小文件时不必为每个文件创建线程
+    """
+    
+    def __init__(self, label: str, done: int, total: int, enabled: bool = True):
+        """
+        Args:
+            label: 进度前缀，如"上传进度"
+            done: 已传输的字节数（断点续传时为起始位置）
+            total: 文件总字节数，为None时只输出done的值
+            enabled: 是否输出进度，为False时不启动后台线程
+        """
+        self.label = label
+        self.done = done
+        self.total = total
+        self.enabled = enabled
+        self._shown = done
+        self._start_done = done
+        self._start_time = None
+        # 预先计算比例系数和输出模板，每次刷新只需一次%格式化
+        self._scale = 100.0 / total if total else 0.0
+        if total is None:
+            self._template = f"\r{label}: %d"
+        else:
+            # 速度固定宽度输出，数值位数变少时不会残留上一次的字符
+            self._template = f"\r{label}: %.1f%% (%d/{total} bytes, %7.2f MB/s)"
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def __enter__(self):
+        self._start_time = time.monotonic()
+        if self.enabled and (self.total is None or self.total - self.done >= PROGRESS_THREAD_MIN_BYTES) \
+                and sys.stdout.isatty():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+        if self.enabled:
+            # 补上最后一次刷新，保证完成时显示最终进度
+            self._show()
+        return False
+    
+    def _run(self):
+        while not self._stop.wait(PROGRESS_INTERVAL):
+            self._show()
+    
+    def _show(self):
+        done = self.done
+        if done == self._shown:
+            return
+        self._shown = done
+        if self.total is None:
+            line = self._template % done
+        else:
+            progress = done * self._scale if self.total else 100.0
+            elapsed = time.monotonic() - self._start_time
+            speed = (done - self._start_done) / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+            line = self._template % (progress, done, speed)
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+class _TunedFTP(ftplib.FTP):
+    """在数据连接建立前调整TCP缓冲区大小、并记录当前传输类型的ftplib.FTP"""
+    
+    # 数据连接的SO_SNDBUF/SO_RCVBUF大小，0表示使用系统默认值
+    tcp_buffer_size = 0
+    # 最近一次TYPE命令设置的传输类型（'A'/'I'），None表示未知
+    transfer_type = None
+    # 最近一次成功切换到的远程工作目录（规范化的绝对路径），None表示未知
+    working_dir = None
+    
+    def reopen_control_file(self, buffer_size: int = CONTROL_BUFFER_SIZE):
+        """
+        按当前编码和指定的缓冲区大小重建控制连接的读取文件对象
+        
+        必须在没有未读取响应时调用，否则旧缓冲区中的数据会丢失
+        
+        Args:
+            buffer_size: 读缓冲区大小
+        """
+        old_file = self.file
+        self.file = self.sock.makefile('r', buffering=buffer_size, encoding=self.encoding)
+        if old_file is not None:
+            old_file.close()
+    
+    def cwd(self, dirname):
+        resp = super().cwd(dirname)
+        self.working_dir = _abs_dir(dirname)
+        return resp
+    
+    def putcmd(self, line):
+        if line[:5].upper() == 'TYPE ':
+            self.transfer_type = line[5:].strip().upper()
+        super().putcmd(line)
+    
+    def makeport(self):
+        sock = super().makeport()
+        # 主动模式下accept得到的数据连接继承监听套接字的缓冲区大小
+        self._tune_data_socket(sock)
+        return sock
+    
+    def ntransfercmd(self, cmd, rest=None):
+        if not self.passiveserver:
+            # 显式调用ftplib.FTP的实现：_TunedFTPTLS中super()会解析到FTP_TLS.ntransfercmd，
+            # 数据连接会被包装两次TLS；TLS包装统一由_TunedFTPTLS.ntransfercmd完成
+            return ftplib.FTP.ntransfercmd(self, cmd, rest)
+        
+        # 被动模式的处理与ftplib相同，只是数据连接由_connect_data建立
+        host, port = self.makepasv()
+        conn = self._connect_data(host, port)
+        try:
+            if rest is not None:
+                self.sendcmd("REST %s" % rest)
+            resp = self.sendcmd(cmd)
+            # 部分服务器在1xx之前先返回2xx，忽略该响应
+            if resp[0] == '2':
+                resp = self.getresp()
+            if resp[0] != '1':
+                raise ftplib.error_reply(resp)
+        except:
+            conn.close()
+            raise
+        size = ftplib.parse150(resp) if resp[:3] == '150' else None
+        return conn, size
+    
+    def _connect_data(self, host, port):
+        """
+        建立被动模式的数据连接
+        
+        与socket.create_connection相同，但指定了tcp_buffer_size时在connect之前设置缓冲区大小：
+        TCP窗口扩大因子在握手时确定，连接建立后再加大接收缓冲区不一定能扩大通告窗口。
+        未指定时不设置，由系统自动调节（Linux上显式设置会关闭自动调节）
+        
+        Args:
+            host: 服务器数据端口的地址
+            port: 服务器数据端口
+            
+        Returns:
+            socket.socket: 已连接的数据连接
+        """
+        error = None
+        for af, socktype, proto, _, address in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+            conn = socket.socket(af, socktype, proto)
+            try:
+                self._tune_data_socket(conn)
+                if self.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    conn.settimeout(self.timeout)
+                if self.source_address:
+                    conn.bind(self.source_address)
+                conn.connect(address)
+                return conn
+            except OSError as e:
+                error = e
+                conn.close()
+        raise error if error is not None else OSError(f"无法解析地址: {host}")
+    
+    def _tune_data_socket(self, conn):
+        # 默认不设置：显式设置的缓冲区大小固定不变，且受rmem_max/wmem_max限制
+        if self.tcp_buffer_size > 0:
+            # 缓冲区需覆盖带宽时延积，否则高延迟链路上吞吐量受限于TCP窗口
+            try:
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.tcp_buffer_size)
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.tcp_buffer_size)
+            except OSError:
+                pass
+
+
+if hasattr(ftplib, 'FTP_TLS'):
+    class _TunedFTPTLS(_TunedFTP, ftplib.FTP_TLS):
+        """使用TLS加密的_TunedFTP，数据连接复用控制连接的TLS会话"""
+        
+        def ntransfercmd(self, cmd, rest=None):
+            # 绕过FTP_TLS.ntransfercmd自行包装数据连接，以便传入控制连接的会话：
+            # 每个文件省去一次完整的TLS握手，要求会话复用的服务器（如vsftpd）也能正常传输
+            conn, size = _TunedFTP.ntransfercmd(self, cmd, rest)
+            if self._prot_p:
+                conn = self.context.wrap_socket(conn, server_hostname=self.host,
+                                                session=self.sock.session)
+            return conn, size
+else:
+    # Python未编译SSL支持
+    _TunedFTPTLS = None
+
+
+_tls_context = None
+
+
+def _get_tls_context():
+    """
+    获取进程内共享的SSLContext，避免每个连接重复加载CA证书
+    
+    Returns:
+        ssl.SSLContext: 默认配置的SSLContext
+    """
+    global _tls_context
+    if _tls_context is None:
+        import ssl
+        _tls_context = ssl.create_default_context()
+    return _tls_context
 
 
 class FTPClient:
     """FTP客户端类，封装FTP连接和文件操作"""
     
-    def __init__(self, host: str, username: str, password: str, encoding: str = 'gbk'):
+    def __init__(self, host: str, username: str, password: str, encoding: str = 'gbk',
+                 workers: int = DEFAULT_WORKERS, verbose: bool = True,
+                 tcp_buffer_size: int = DEFAULT_TCP_BUFFER_SIZE, backend: str = 'ftplib',
+                 resume_threshold: int = DEFAULT_RESUME_THRESHOLD, tls: bool = False,
+                 skip_unchanged: bool = False, blocksize: int = BLOCKSIZE):
         """
         初始化FTP客户端
         
@@ -27,43 +490,194 @@ class FTPClient:
             host: FTP服务器地址
             username: FTP用户名
             password: FTP密码
-            encoding: FTP连接编码，默认为'gbk'
+            encoding: FTP连接编码，默认为'gbk'；为'auto'时登录后尝试OPTS UTF8 ON，
+                服务器接受则使用UTF-8，否则使用AUTO_ENCODING_FALLBACK
+            workers: 目录传输时的并发连接数，小于等于1时串行传输
+            verbose: 是否显示连接信息和传输进度
+            tcp_buffer_size: 数据连接的TCP收发缓冲区大小，0表示由系统自动调节
+            backend: 文件数据的传输实现，'ftplib'或'pycurl'；pycurl未安装时回退到ftplib
+            resume_threshold: 小于该大小的文件直接整体上传，不探测远程大小也不续传
+            tls: 是否使用显式FTPS（AUTH TLS）加密控制连接和数据连接
+            skip_unchanged: 上传时跳过远程大小相同且修改时间不早于本地文件的文件
+            blocksize: 数据连接每次读写的块大小
         """
         self.host = host
         self.username = username
         self.password = password
         self.encoding = encoding
+        self.workers = workers
+        self.verbose = verbose
+        self.tcp_buffer_size = tcp_buffer_size
+        if backend == 'pycurl' and pycurl is None:
+            print("未安装pycurl，使用ftplib传输")
+            backend = 'ftplib'
+        self.backend = backend
+        self.resume_threshold = resume_threshold
+        self.tls = tls
+        self.skip_unchanged = skip_unchanged
+        self.blocksize = blocksize
+        # 数据收发复用的缓冲区，首次需要时分配
+        self._buffers = []
+        # pycurl后端复用的句柄，libcurl在句柄内保持控制连接
+        self._curl = None
         self.ftp = None
         self.connected = False
+        # 已确认存在的远程目录（规范化的绝对路径）
+        self._ensured_dirs = set()
+        # 本次会话中由MKD新建的远程目录，其中的文件不必探测远程大小
+        self._created_dirs = set()
+        # 服务器是否支持MLSD/MLST，None表示尚未探测
+        self._mlsd_supported = None
+        self._mlst_supported = None
+        # 是否已通过OPTS MLST限定MLSD/MLST返回的事实
+        self._mlst_facts_selected = False
+        # 服务器是否能正确处理连续发送的多条命令
+        self._pipelining = True
+        # FEAT返回的服务器特性，None表示服务器不支持FEAT
+        self.features = None
     
-    def connect(self) -> bool:
+    def open_session(self) -> ftplib.FTP:
+        """
+        新建一个已登录的FTP会话，不修改当前客户端的连接
+        
+        Returns:
+            ftplib.FTP: 已登录的FTP会话
+        """
+        if self.tls:
+            if _TunedFTPTLS is None:
+                raise RuntimeError("当前Python不支持SSL，无法使用TLS连接")
+            ftp_class = _TunedFTPTLS
+            options = {'context': _get_tls_context()}
+        else:
+            ftp_class = _TunedFTP
+            options = {}
+        
+        encoding = AUTO_ENCODING_FALLBACK if self.encoding == 'auto' else self.encoding
+        # 兼容不同Python版本的FTP连接方式
+        try:
+            # Python 3.9+ 支持encoding参数
+            ftp = ftp_class(self.host, encoding=encoding, **options)
+        except TypeError:
+            # Python 3.8及以下版本不支持encoding参数
+            ftp = ftp_class(self.host, **options)
+            # 手动设置编码
+            ftp.encoding = encoding
+        
+        try:
+            ftp.tcp_buffer_size = self.tcp_buffer_size
+            # 控制连接上都是短命令，关闭Nagle算法以免命令被推迟发送；
+            # 开启keepalive，避免长时间传输期间空闲的控制连接被NAT或防火墙断开
+            try:
+                ftp.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                ftp.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                # 系统默认空闲2小时才开始探测，远长于常见NAT会话的超时时间；
+                # macOS上空闲时间的选项名为TCP_KEEPALIVE，不支持的平台跳过
+                for name, value in (('TCP_KEEPIDLE', KEEPALIVE_IDLE), ('TCP_KEEPALIVE', KEEPALIVE_IDLE),
+                                    ('TCP_KEEPINTVL', KEEPALIVE_INTERVAL), ('TCP_KEEPCNT', KEEPALIVE_COUNT)):
+                    if name == 'TCP_KEEPALIVE' and hasattr(socket, 'TCP_KEEPIDLE'):
+                        continue
+                    if hasattr(socket, name):
+                        ftp.sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, name), value)
+            except OSError:
+                pass
+            # TLS模式下login会先发送AUTH TLS
+            ftp.login(self.username, self.password)
+            if self.tls:
+                ftp.prot_p()
+            if self.encoding == 'auto':
+                # UTF-8编解码比GBK快，且能表示任意文件名；服务器不支持时保留回退编码
+                try:
+                    ftp.sendcmd('OPTS UTF8 ON')
+                    ftp.encoding = 'utf-8'
+                except ftplib.Error:
+                    pass
+            # 此时没有未读取的响应，重建控制连接的读取对象：一是加大读缓冲区，
+            # 二是让旧版本Python在手动设置编码后也按该编码解码响应
+            ftp.reopen_control_file()
+        except:
+            ftp.close()
+            raise
+        return ftp
+    
+    def connect(self, server_state: dict = None) -> bool:
         """
         连接到FTP服务器
         
+        Args:
+            server_state: 同一服务器上另一个连接探测到的特性（server_state()的返回值），
+                提供时沿用而不再发送FEAT
+            
         Returns:
             bool: 连接是否成功
         """
         try:
-            # 兼容不同Python版本的FTP连接方式
-            try:
-                # Python 3.9+ 支持encoding参数
-                self.ftp = ftplib.FTP(self.host, encoding=self.encoding)
-            except TypeError:
-                # Python 3.8及以下版本不支持encoding参数
-                self.ftp = ftplib.FTP(self.host)
-                # 手动设置编码
-                self.ftp.encoding = self.encoding
-            
-            self.ftp.login(self.username, self.password)
+            self.ftp = self.open_session()
+            if server_state is None:
+                self._load_features()
+            else:
+                for name, value in server_state.items():
+                    setattr(self, name, value)
             self.connected = True
-            print(f"成功连接到FTP服务器: {self.host}")
+            if self.verbose:
+                print(f"成功连接到FTP服务器: {self.host}")
             return True
         except Exception as e:
             print(f"连接FTP服务器失败: {e}")
             return False
     
+    def server_state(self) -> dict:
+        """
+        获取已探测到的服务器特性，供连接同一服务器的其他客户端沿用
+        
+        Returns:
+            dict: 特性相关属性名到值的映射
+        """
+        return {
+            'features': self.features,
+            '_mlsd_supported': self._mlsd_supported,
+            '_mlst_supported': self._mlst_supported,
+            '_pipelining': self._pipelining,
+        }
+    
+    def _load_features(self):
+        """通过FEAT一次性获取服务器特性，据此预先确定MLST/MLSD等命令是否可用"""
+        try:
+            resp = self.ftp.sendcmd('FEAT')
+        except ftplib.Error:
+            self.features = None
+            return
+        
+        features = set()
+        for line in resp.splitlines()[1:-1]:
+            feature = line.strip().upper()
+            if feature:
+                features.add(feature)
+                features.add(feature.split()[0])
+        self.features = features
+        
+        # RFC 3659: MLST特性同时表示支持MLSD
+        if 'MLST' not in features:
+            self._mlst_supported = False
+            if 'MLSD' not in features:
+                self._mlsd_supported = False
+    
+    def _has_feature(self, name: str) -> bool:
+        """
+        判断服务器是否支持指定特性，服务器不支持FEAT时按支持处理
+        
+        Args:
+            name: 特性名，如'SIZE'、'REST STREAM'
+            
+        Returns:
+            bool: 是否支持
+        """
+        return self.features is None or name in self.features
+    
     def disconnect(self):
         """断开FTP连接"""
+        if self._curl is not None:
+            self._curl.close()
+            self._curl = None
         if self.ftp and self.connected:
             try:
                 self.ftp.quit()
@@ -71,7 +685,11 @@ class FTPClient:
                 self.ftp.close()
             finally:
                 self.connected = False
-                print("已断开FTP连接")
+                if self.verbose:
+                    print("已断开FTP连接")
+        # 重新连接后远程目录可能已被删除，不再沿用；集合可能与连接池共享，只替换本客户端的引用
+        self._ensured_dirs = set()
+        self._created_dirs = set()
     
     def ensure_remote_directory(self, remote_path: str) -> bool:
         """
@@ -83,52 +701,131 @@ class FTPClient:
         Returns:
             bool: 目录是否存在或创建成功
         """
+        directories = [d for d in remote_path.split('/') if d]
+        remote_path = '/' + '/'.join(directories)
+        if remote_path in self._ensured_dirs:
+            return True
+        
         try:
-            self.ftp.cwd('/')
-            
-            directories = [d for d in remote_path.split('/') if d]
-            for directory in directories:
-                try:
-                    self.ftp.cwd(directory)
-                except:
-                    self.ftp.mkd(directory)
-                    self.ftp.cwd(directory)
+            # 一次发出所有未确认前缀的MKD，末尾以CWD确认目标目录确实存在；
+            # 已存在的目录MKD返回550，忽略即可，任意深度都只消耗一次往返
+            prefixes = ['/' + '/'.join(directories[:i]) for i in range(1, len(directories) + 1)]
+            missing = [prefix for prefix in prefixes if prefix not in self._ensured_dirs]
+            replies = self._pipeline([f"MKD {prefix}" for prefix in missing] + [f"CWD {remote_path}"])
+            if isinstance(replies[-1], Exception):
+                raise replies[-1]
             
+            for prefix, resp in zip(missing, replies):
+                if isinstance(resp, str) and resp.startswith('257'):
+                    self._created_dirs.add(prefix)
+            self._ensured_dirs.update(prefixes)
+            self._ensured_dirs.add(remote_path)
             return True
         except Exception as e:
             print(f"创建远程目录失败: {e}")
             return False
     
-    def upload_file(self, local_file: str, remote_file: str) -> bool:
+    def ensure_remote_directories(self, remote_paths: list) -> None:
+        """
+        批量确保多个远程目录存在，所有未确认目录的MKD与确认用的CWD以流水线方式发出
+        
+        每个目录单独调用ensure_remote_directory时各需一次往返，批量处理时整批只需一次；
+        创建失败的目录不记入缓存，之后单独调用ensure_remote_directory时会重试并报告错误
+        
+        Args:
+            remote_paths: 远程目录路径列表
+        """
+        missing = []
+        seen = set()
+        for remote_path in remote_paths:
+            directories = [d for d in remote_path.split('/') if d]
+            for i in range(1, len(directories) + 1):
+                prefix = '/' + '/'.join(directories[:i])
+                if prefix not in self._ensured_dirs and prefix not in seen:
+                    seen.add(prefix)
+                    missing.append(prefix)
+        if not missing:
+            return
+        
+        cmds = []
+        for prefix in missing:
+            cmds.append(f"MKD {prefix}")
+            cmds.append(f"CWD {prefix}")
+        replies = self._pipeline(cmds)
+        for i, prefix in enumerate(missing):
+            mkd_resp, cwd_resp = replies[2 * i], replies[2 * i + 1]
+            if isinstance(cwd_resp, str):
+                self._ensured_dirs.add(prefix)
+                if isinstance(mkd_resp, str) and mkd_resp.startswith('257'):
+                    self._created_dirs.add(prefix)
+    
+    def upload_file(self, local_file: str, remote_file: str, local_stat: os.stat_result = None,
+                    remote_facts: dict = None) -> bool:
         """
         上传单个文件到FTP服务器，支持断点续传
         
         Args:
             local_file: 本地文件路径
             remote_file: 远程文件路径
+            local_stat: 已知的本地文件stat结果（大小、修改时间），提供时不再重复stat
+            remote_facts: 调用方已知的远程文件属性（来自MLSD，文件不存在时为空字典），提供时不再探测
             
         Returns:
             bool: 上传是否成功
         """
         try:
-            local_path = Path(local_file)
-            if not local_path.is_file():
-                print(f"本地文件不存在: {local_file}")
+            if local_stat is None:
+                local_stat = self._local_stat(local_file)
+                if local_stat is None:
+                    print(f"本地文件不存在: {local_file}")
+                    return False
+            if not stat.S_ISREG(local_stat.st_mode):
+                print(f"不是普通文件，无法上传: {local_file}")
                 return False
-            
-           
-            file_size = local_path.stat().st_size
+            file_size = local_stat.st_size
             
             
             remote_size = 0
-            try:
-                remote_size = self.ftp.size(remote_file)
-            except:
+            remote_mtime = None
+            remote_dir = posixpath.dirname(remote_file)
+            # 小文件重传的代价小于SIZE探测的往返，直接整体上传；服务器无法断点续传时也不必探测；
+            # 目录是本次会话新建的，其中不会有未完成的上传，也不必探测
+            resumable = file_size >= self.resume_threshold and self._has_feature('REST STREAM')
+            if remote_facts is not None:
+                self._binary_mode()
+                size = remote_facts.get('size')
+                remote_size = int(size) if size and size.isdigit() else 0
+                if 'modify' in remote_facts:
+                    remote_mtime = _parse_time_val(remote_facts['modify'])
+            elif _abs_dir(remote_dir) not in self._created_dirs and self._has_feature('SIZE') \
+                    and (resumable or self.skip_unchanged):
+                # TYPE I与SIZE（以及MDTM）一次发出，只消耗一次往返
+                commands = ['TYPE I', f"SIZE {remote_file}"]
+                if self.skip_unchanged and self._has_feature('MDTM'):
+                    commands.append(f"MDTM {remote_file}")
+                replies = self._pipeline(commands)
+                if isinstance(replies[0], Exception):
+                    raise replies[0]
+                size_resp = replies[1]
+                if isinstance(size_resp, str) and size_resp.startswith('213'):
+                    remote_size = int(size_resp[3:].strip())
+                if len(replies) > 2 and isinstance(replies[2], str) and replies[2].startswith('213'):
+                    remote_mtime = _parse_time_val(replies[2][3:])
+            else:
+                self._binary_mode()
+            
+            if self.skip_unchanged and remote_size == file_size and remote_mtime is not None \
+                    and int(local_stat.st_mtime) <= remote_mtime:
+                if self.verbose:
+                    print(f"远程文件未变化，跳过: {remote_file}")
+                return True
+            if not resumable:
                 remote_size = 0
             
             
             if remote_size > 0 and remote_size < file_size:
-                print(f"发现未完成的上传，继续从 {remote_size} 字节处上传")
+                if self.verbose:
+                    print(f"发现未完成的上传，继续从 {remote_size} 字节处上传")
                 mode = 'ab'
                 start_pos = remote_size
             else:
@@ -136,63 +833,604 @@ class FTPClient:
                 start_pos = 0
             
             
-            remote_dir = os.path.dirname(remote_file)
-            if remote_dir and not self.ensure_remote_directory(remote_dir):
+            if remote_dir and remote_dir not in self._ensured_dirs and not self.ensure_remote_directory(remote_dir):
                 return False
             
             
-            with open(local_file, 'rb') as f:
-                if start_pos > 0:
-                    f.seek(start_pos)
+            with open(local_file, 'rb') as f, \
+                    _ProgressReporter("上传进度", start_pos, file_size, self.verbose) as progress:
                 
-                def callback(data):
-                    nonlocal start_pos
-                    start_pos += len(data)
-                    progress = (start_pos / file_size) * 100
-                    sys.stdout.write(f"\r上传进度: {progress:.1f}% ({start_pos}/{file_size} bytes)")
-                    sys.stdout.flush()
+                def callback(sent):
+                    progress.done += sent
                 
-                self.ftp.storbinary(f"STOR {remote_file}", f, blocksize=8192, callback=callback, rest=start_pos)
+                # 顺序读取，让内核加大预读
+                _fadvise(f.fileno(), 'POSIX_FADV_SEQUENTIAL')
+                self._store_file(f, remote_file, start_pos, callback)
+                # 传输完成后释放该文件占用的页缓存，避免大文件挤占其他热数据
+                _fadvise(f.fileno(), 'POSIX_FADV_DONTNEED')
             
-            print(f"\n文件上传成功: {local_file} -> {remote_file}")
+            if self.verbose:
+                print(f"\n文件上传成功: {local_file} -> {remote_file}")
             return True
             
         except Exception as e:
             print(f"\n文件上传失败: {e}")
             return False
     
-    def list_directory(self, remote_dir: str = '/') -> bool:
-
+    def _store_file(self, f, remote_file: str, rest: int, callback) -> None:
+        """
+        通过socket.sendfile把本地文件写入STOR数据连接，由内核完成文件到套接字的拷贝
+        
+        无法使用sendfile(2)的场合（TLS数据连接、没有os.sendfile的平台）改为复用同一块缓冲区读取并发送，
+        而不使用socket.sendfile内部每次只读8KB的回退实现
+        
+        Args:
+            f: 以二进制模式打开的本地文件
+            remote_file: 远程文件路径
+            rest: 断点续传的起始位置
+            callback: 每发送一段数据后以本次发送的字节数调用
+        """
+        if self.backend == 'pycurl':
+            self._curl_store_file(f, remote_file, rest, callback)
+            return
+        
+        # 调用方已切换到二进制模式
+        conn, _ = self.ftp.ntransfercmd(f"STOR {remote_file}", rest or None)
+        try:
+            if hasattr(os, 'sendfile') and type(conn) is socket.socket:
+                offset = rest
+                while True:
+                    # 分段发送，段与段之间更新进度
+                    sent = conn.sendfile(f, offset=offset, count=self.blocksize)
+                    if not sent:
+                        break
+                    offset += sent
+                    callback(sent)
+            else:
+                f.seek(rest)
+                buf = self._transfer_buffer()
+                view = memoryview(buf)
+                while True:
+                    read = f.readinto(buf)
+                    if not read:
+                        break
+                    conn.sendall(view[:read])
+                    callback(read)
+            _unwrap_tls(conn)
+        finally:
+            conn.close()
+        self.ftp.voidresp()
+    
+    def stat(self, remote_path: str, binary: bool = False):
+        """
+        获取远程路径的类型和大小，优先使用MLST在一次往返内完成
+        
+        服务器不支持MLST时回退到SIZE探测文件、CWD探测目录
+        
+        Args:
+            remote_path: 远程路径
+            binary: 是否同时切换到二进制传输模式（TYPE I与探测命令一次发出）
+            
+        Returns:
+            dict: {'type': 'dir'或'file', 'size': 文件大小(未知时为None)}，路径不存在时返回None
+        """
+        prefix = ['TYPE I'] if binary else []
+        if self._mlst_supported is not False:
+            replies = self._pipeline(prefix + [f"MLST {remote_path}"])
+            resp = replies[-1]
+            if prefix and isinstance(replies[0], Exception):
+                raise replies[0]
+            if isinstance(resp, str):
+                self._mlst_supported = True
+                return _parse_mlst(resp)
+            if not isinstance(resp, ftplib.error_perm):
+                raise resp
+            if not str(resp).startswith(('500', '501', '502', '504')):
+                return None
+            self._mlst_supported = False
+            prefix = []
+        
+        replies = self._pipeline(prefix + [f"SIZE {remote_path}"])
+        if prefix and isinstance(replies[0], Exception):
+            raise replies[0]
+        resp = replies[-1]
+        if isinstance(resp, str) and resp.startswith('213'):
+            return {'type': 'file', 'size': int(resp[3:].strip())}
+        if not isinstance(resp, ftplib.error_perm):
+            raise resp if isinstance(resp, Exception) else ftplib.error_reply(resp)
+        
+        try:
+            self._chdir(remote_path)
+            return {'type': 'dir', 'size': None}
+        except ftplib.error_perm:
+            return None
+    
+    def _retrieve_file(self, remote_file: str, rest: int, fd: int, callback, size: int = None) -> None:
+        """
+        打开RETR数据连接并把收到的数据写入文件描述符，调用方需已切换到二进制模式
+        
+        Linux上的普通TCP数据连接通过splice(2)经管道直接搬运到文件，数据不进入用户态；
+        其他情况（TLS、设置了超时的套接字、非Linux平台）逐块recv_into到复用的缓冲区后写入，
+        数据较多时由独立线程写文件，磁盘写入变慢时不会阻塞接收
+        
+        Args:
+            remote_file: 远程文件路径
+            rest: 断点续传的起始位置
+            fd: 已定位到写入位置的文件描述符，不能带O_APPEND（splice不支持）
+            callback: 每写入一段数据后以本次写入的字节数调用
+            size: 预计接收的字节数，未知时为None
+        """
+        if self.backend == 'pycurl':
+            self._curl_retrieve_file(remote_file, rest, fd, callback)
+            return
+        
+        conn, _ = self.ftp.ntransfercmd(f"RETR {remote_file}", rest or None)
+        try:
+            if hasattr(os, 'splice') and type(conn) is socket.socket and conn.gettimeout() is None:
+                self._splice_to_fd(conn, fd, callback, self.blocksize)
+            elif size is not None and size >= WRITER_THREAD_MIN_BYTES:
+                self._recv_to_fd_threaded(conn, fd, callback)
+            else:
+                self._recv_to_fd(conn, fd, callback)
+            _unwrap_tls(conn)
+        finally:
+            conn.close()
+        self.ftp.voidresp()
+    
+    def _recv_to_fd(self, conn, fd: int, callback) -> None:
+        """
+        把数据连接中的数据接收到复用的缓冲区，收满后写入文件，直到对端关闭连接
+        
+        缓冲区收满后才写入文件，每次recv只返回一个TCP段时也不会逐段产生write调用
+        
+        Args:
+            conn: 数据连接
+            fd: 目标文件描述符
+            callback: 每写入一段数据后以字节数调用
+        """
+        buf = self._transfer_buffer()
+        view = memoryview(buf)
+        filled = 0
+        try:
+            while True:
+                received = conn.recv_into(view[filled:])
+                if not received:
+                    break
+                filled += received
+                if filled == len(buf):
+                    _write_all(fd, view)
+                    callback(filled)
+                    filled = 0
+        finally:
+            # 进度只统计已写入文件的数据，中断时先写入已收到的部分，续传位置才准确
+            if filled:
+                _write_all(fd, view[:filled])
+                callback(filled)
+    
+    def _recv_to_fd_threaded(self, conn, fd: int, callback) -> None:
+        """
+        与_recv_to_fd相同，但由独立线程写文件
+        
+        接收线程与写文件线程之间轮转WRITE_BUFFER_COUNT块缓冲区：磁盘写入短暂变慢时
+        接收线程仍能继续读取套接字，TCP接收窗口不会因此收缩；写入顺序与接收顺序一致
+        
+        Args:
+            conn: 数据连接
+            fd: 目标文件描述符
+            callback: 每写入一段数据后以字节数调用（在写文件线程中调用）
+        """
+        free_buffers = queue.Queue()
+        for buf in self._transfer_buffers(WRITE_BUFFER_COUNT):
+            free_buffers.put(buf)
+        filled_buffers = queue.Queue()
+        errors = []
+        
+        def writer():
+            try:
+                while True:
+                    item = filled_buffers.get()
+                    if item is None:
+                        return
+                    buf, length = item
+                    _write_all(fd, memoryview(buf)[:length])
+                    callback(length)
+                    free_buffers.put(buf)
+            except Exception as e:
+                errors.append(e)
+                # 唤醒等待空闲缓冲区的接收线程
+                free_buffers.put(None)
+        
+        thread = threading.Thread(target=writer, daemon=True)
+        thread.start()
         try:
+            while True:
+                buf = free_buffers.get()
+                if buf is None:
+                    break
+                view = memoryview(buf)
+                filled = 0
+                while filled < len(buf):
+                    received = conn.recv_into(view[filled:])
+                    if not received:
+                        break
+                    filled += received
+                if filled:
+                    filled_buffers.put((buf, filled))
+                if filled < len(buf):
+                    break
+        finally:
+            # 接收出错时写文件线程也会先写完已收到的数据，续传位置才准确
+            filled_buffers.put(None)
+            thread.join()
+        if errors:
+            raise errors[0]
+    
+    def _transfer_buffer(self) -> bytearray:
+        """
+        获取本客户端复用的数据缓冲区
+        
+        一个客户端同一时间只进行一个传输，所有文件共用同一块缓冲区，
+        连续传输大量小文件时不必为每个文件分配并清零blocksize大小的内存
+        
+        Returns:
+            bytearray: 大小为blocksize的缓冲区
+        """
+        return self._transfer_buffers(1)[0]
+    
+    def _transfer_buffers(self, count: int) -> list:
+        """
+        获取本客户端复用的多块数据缓冲区，不足时补充分配
+        
+        Args:
+            count: 需要的缓冲区个数
+            
+        Returns:
+            list: count块大小为blocksize的缓冲区
+        """
+        while len(self._buffers) < count:
+            self._buffers.append(bytearray(self.blocksize))
+        return self._buffers[:count]
+    
+    @staticmethod
+    def _splice_to_fd(conn, fd: int, callback, blocksize: int = BLOCKSIZE) -> None:
+        """
+        通过管道把套接字中的数据splice到文件，直到对端关闭连接
+        
+        Args:
+            conn: 阻塞模式的数据连接
+            fd: 目标文件描述符
+            callback: 每搬运一段数据后以字节数调用
+            blocksize: 每次splice搬运的最大字节数
+        """
+        pipe_r, pipe_w = os.pipe()
+        try:
+            if hasattr(fcntl, 'F_SETPIPE_SZ'):
+                # 加大管道容量，使每次splice能搬运更多数据
+                try:
+                    fcntl.fcntl(pipe_w, fcntl.F_SETPIPE_SZ, blocksize)
+                except OSError:
+                    pass
+            
+            sock_fd = conn.fileno()
+            while True:
+                received = os.splice(sock_fd, pipe_w, blocksize)
+                if not received:
+                    break
+                remaining = received
+                while remaining:
+                    remaining -= os.splice(pipe_r, fd, remaining)
+                callback(received)
+        finally:
+            os.close(pipe_r)
+            os.close(pipe_w)
+    
+    def _curl_handle(self, remote_file: str):
+        """
+        获取复用的pycurl句柄并指向远程文件
+        
+        Args:
+            remote_file: 远程文件路径
+            
+        Returns:
+            pycurl.Curl: 已设置URL和登录信息的句柄
+        """
+        if self._curl is None:
+            c = pycurl.Curl()
+            c.setopt(pycurl.USERNAME, self.username.encode(self.ftp.encoding))
+            c.setopt(pycurl.PASSWORD, self.password.encode(self.ftp.encoding))
+            # 直接以完整路径发送STOR/RETR，不逐级CWD
+            c.setopt(pycurl.FTP_FILEMETHOD, pycurl.FTPMETHOD_NOCWD)
+            c.setopt(pycurl.BUFFERSIZE, self.blocksize)
+            c.setopt(pycurl.NOSIGNAL, 1)
+            if self.tls:
+                c.setopt(pycurl.USE_SSL, pycurl.USESSL_ALL)
+            if self.tcp_buffer_size > 0:
+                c.setopt(pycurl.SOCKOPTFUNCTION, self._curl_sockopt)
+            self._curl = c
+        
+        # URL中的路径按服务器编码转义，%2F表示从根目录开始的绝对路径
+        if remote_file.startswith('/'):
+            path = '%2F' + quote(remote_file.lstrip('/'), encoding=self.ftp.encoding)
+        else:
+            path = quote(remote_file, encoding=self.ftp.encoding)
+        self._curl.setopt(pycurl.URL, f"ftp://{self.host}/{path}")
+        return self._curl
+    
+    def _curl_sockopt(self, curlfd: int, purpose: int) -> int:
+        """libcurl创建套接字后调整TCP收发缓冲区大小"""
+        sock = socket.socket(fileno=curlfd)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.tcp_buffer_size)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.tcp_buffer_size)
+        except OSError:
+            pass
+        finally:
+            sock.detach()
+        return pycurl.SOCKOPT_OK
+    
+    def _curl_store_file(self, f, remote_file: str, rest: int, callback) -> None:
+        """
+        通过pycurl上传文件，数据连接的收发完全在libcurl中完成
+        
+        Args:
+            f: 以二进制模式打开的本地文件
+            remote_file: 远程文件路径
+            rest: 断点续传的起始位置，非0时以APPE追加剩余部分
+            callback: 每读出一段数据后以本次读出的字节数调用
+        """
+        f.seek(rest)
+        
+        def read(size):
+            data = f.read(size)
+            callback(len(data))
+            return data
+        
+        c = self._curl_handle(remote_file)
+        c.setopt(pycurl.UPLOAD, 1)
+        c.setopt(pycurl.APPEND, 1 if rest else 0)
+        c.setopt(pycurl.RESUME_FROM_LARGE, 0)
+        c.setopt(pycurl.INFILESIZE_LARGE, os.fstat(f.fileno()).st_size - rest)
+        c.setopt(pycurl.READFUNCTION, read)
+        c.perform()
+    
+    def _curl_retrieve_file(self, remote_file: str, rest: int, fd: int, callback) -> None:
+        """
+        通过pycurl下载文件并写入文件描述符
+        
+        Args:
+            remote_file: 远程文件路径
+            rest: 断点续传的起始位置
+            fd: 已定位到写入位置的文件描述符
+            callback: 每写入一段数据后以本次写入的字节数调用
+        """
+        def write(data):
+            _write_all(fd, data)
+            callback(len(data))
+        
+        c = self._curl_handle(remote_file)
+        c.setopt(pycurl.UPLOAD, 0)
+        c.setopt(pycurl.APPEND, 0)
+        c.setopt(pycurl.RESUME_FROM_LARGE, rest)
+        c.setopt(pycurl.WRITEFUNCTION, write)
+        c.perform()
+    
+    def _binary_mode(self) -> None:
+        """切换到二进制传输模式，连接已处于该模式时不再发送TYPE I"""
+        if self.ftp.transfer_type != 'I':
+            self.ftp.voidcmd('TYPE I')
+    
+    def _pipeline(self, cmds: list) -> list:
+        """
+        一次发出多条命令再依次读取响应，使多条命令只消耗一次往返
+        
+        命令较多时按PIPELINE_BATCH_SIZE分批发送；服务器返回无法解析的响应时关闭流水线，此后逐条发送
+        
+        Args:
+            cmds: 命令列表
+            
+        Returns:
+            list: 与命令一一对应的响应字符串，命令失败时对应位置为ftplib异常对象
+        """
+        if not self._pipelining:
+            replies = []
+            for cmd in cmds:
+                try:
+                    replies.append(self.ftp.sendcmd(cmd))
+                except ftplib.Error as e:
+                    replies.append(e)
+            self._track_cwd(cmds, replies)
+            return replies
+        
+        if len(cmds) > PIPELINE_BATCH_SIZE:
+            replies = []
+            for start in range(0, len(cmds), PIPELINE_BATCH_SIZE):
+                replies.extend(self._pipeline(cmds[start:start + PIPELINE_BATCH_SIZE]))
+            return replies
+        
+        for cmd in cmds:
+            if '\r' in cmd or '\n' in cmd:
+                raise ValueError('an illegal newline character should not be contained')
+            if cmd[:5].upper() == 'TYPE ':
+                self.ftp.transfer_type = cmd[5:].strip().upper()
+        # 合并为一次写入，避免Nagle算法推迟后续命令
+        self.ftp.sock.sendall(''.join(cmd + ftplib.CRLF for cmd in cmds).encode(self.ftp.encoding))
+        
+        replies = []
+        for _ in cmds:
+            try:
+                replies.append(self.ftp.getresp())
+            except ftplib.error_proto as e:
+                self._pipelining = False
+                replies.append(e)
+            except ftplib.Error as e:
+                replies.append(e)
+        self._track_cwd(cmds, replies)
+        return replies
+    
+    def _track_cwd(self, cmds: list, replies: list) -> None:
+        """根据成功的CWD命令更新记录的远程工作目录"""
+        for cmd, reply in zip(cmds, replies):
+            if cmd[:4].upper() == 'CWD ' and isinstance(reply, str):
+                self.ftp.working_dir = _abs_dir(cmd[4:])
+    
+    def _chdir(self, remote_dir: str) -> None:
+        """
+        切换远程工作目录，已位于该目录时不发送CWD
+        
+        Args:
+            remote_dir: 远程目录路径
+        """
+        target = _abs_dir(remote_dir)
+        if target is None or target != self.ftp.working_dir:
             self.ftp.cwd(remote_dir)
+        if target is not None:
+            # 切换成功说明目录存在，之后在其中上传文件时无需再创建
+            self._ensured_dirs.add(target)
+    
+    def _list(self, remote_dir: str) -> list:
+        """
+        获取远程目录的条目列表，优先使用MLSD，服务器不支持时回退到解析LIST输出
+        
+        Args:
+            remote_dir: 远程目录路径
             
-            items = []
-            self.ftp.retrlines('LIST', items.append)
+        Returns:
+            list: (文件名, 属性字典) 元组列表，属性字典包含 type('dir'/'file')、size、modify
+        """
+        if self._mlsd_supported is not False:
+            if not self._mlst_facts_selected:
+                self._select_mlst_facts()
+            try:
+                entries = self._mlsd(remote_dir)
+                self._mlsd_supported = True
+                return entries
+            except ftplib.error_perm as e:
+                # 550等错误说明目录本身有问题，只有命令不被支持时才回退
+                if not str(e).startswith(('500', '501', '502', '504')):
+                    raise
+                self._mlsd_supported = False
+        
+        self._chdir(remote_dir)
+        items = []
+        self.ftp.retrlines('LIST', items.append)
+        
+        entries = []
+        for item in items:
+            match = _LIST_RE.match(item)
+            if match:
+                # 一次正则匹配取出所需字段，文件名中的连续空格也得以保留；
+                # 修改时间直接从原行切片，不再拼接月、日、时间三个字段
+                kind, size, filename = match.group(1, 2, 6)
+                if filename in ('.', '..'):
+                    continue
+                
+                entries.append((filename, {
+                    'type': 'dir' if kind == 'd' else 'file',
+                    'size': size,
+                    'modify': item[match.start(3):match.end(5)],
+                }))
+                continue
+            
+            match = _DOS_LIST_RE.match(item)
+            if match:
+                size, filename = match.group(3, 4)
+                if filename in ('.', '..'):
+                    continue
+                
+                is_dir = size == '<DIR>'
+                entries.append((filename, {
+                    'type': 'dir' if is_dir else 'file',
+                    'size': '-' if is_dir else size,
+                    'modify': item[:match.end(2)],
+                }))
+                continue
+            
+            # 其他格式的行按空白拆分处理，最多拆出9段，文件名作为最后一段保持原样
+            parts = item.split(None, 8)
+            if len(parts) < 3:
+                continue
+            
+            filename = parts[-1]
+            if filename in ('.', '..'):
+                continue
+            
+            entries.append((filename, {
+                'type': 'dir' if parts[0].startswith('d') else 'file',
+                'size': parts[4] if len(parts) >= 5 else '-',
+                'modify': ' '.join(parts[5:8]) if len(parts) >= 8 else '-',
+            }))
+        return entries
+    
+    def _mlsd(self, remote_dir: str) -> list:
+        """
+        通过MLSD获取目录条目
+        
+        ftplib.FTP.mlsd每次都先发送TYPE A，目录下载中列目录与下载文件交替时，
+        每个目录要多出切换到TYPE A和切回TYPE I两次往返；MLSD的输出格式固定、与TYPE无关，
+        因此沿用当前的传输类型直接读取
+        
+        Args:
+            remote_dir: 远程目录路径
+            
+        Returns:
+            list: (文件名, 属性字典) 元组列表，不含当前目录和上级目录
+        """
+        entries = []
+        conn, _ = self.ftp.ntransfercmd(f"MLSD {remote_dir}")
+        try:
+            with conn.makefile('r', encoding=self.ftp.encoding) as fp:
+                for line in fp:
+                    fact_str, _, name = line.rstrip('\r\n').partition(' ')
+                    facts = {}
+                    for fact in fact_str.split(';'):
+                        key, _, value = fact.partition('=')
+                        if key:
+                            facts[key.lower()] = value
+                    entry_type = facts.get('type', '').lower()
+                    if entry_type in ('cdir', 'pdir') or name in ('.', '..'):
+                        continue
+                    facts['type'] = 'dir' if entry_type == 'dir' else 'file'
+                    entries.append((name, facts))
+            _unwrap_tls(conn)
+        finally:
+            conn.close()
+        self.ftp.voidresp()
+        return entries
+    
+    def _select_mlst_facts(self) -> None:
+        """
+        每个连接只发送一次OPTS MLST，让服务器只返回用到的事实，减少大目录列表的数据量
+        
+        ftplib.FTP.mlsd的facts参数会在每次列目录前重复发送该命令，因此不使用
+        """
+        self._mlst_facts_selected = True
+        if self.features is None or 'MLST' not in self.features:
+            return
+        try:
+            self.ftp.sendcmd('OPTS MLST type;size;modify;')
+        except ftplib.Error:
+            pass
+    
+    def list_directory(self, remote_dir: str = '/') -> bool:
+
+        try:
+            entries = self._list(remote_dir)
             
-            if not items:
+            if not entries:
                 print(f"目录 '{remote_dir}' 为空")
                 return True
             
             print(f"目录 '{remote_dir}' 的内容:")
             print("-" * 80)
             
-            for item in items:
-                parts = item.split()
-                if len(parts) < 3:
-                    continue
-                
-                is_dir = parts[0].startswith('d') if parts[0] else False
-                file_size = parts[4] if len(parts) >= 5 else "-"
-                
-                time_parts = parts[5:8] if len(parts) >= 8 else []
-                mod_time = ' '.join(time_parts) if time_parts else "-"
-                
-                filename = ' '.join(parts[8:]) if len(parts) >= 9 else parts[-1]
+            for filename, facts in entries:
+                file_size = facts.get('size', '-')
+                mod_time = facts.get('modify', '-')
+                # MLSD的修改时间格式为YYYYMMDDHHMMSS
+                if len(mod_time) >= 12 and mod_time[:12].isdigit():
+                    mod_time = f"{mod_time[0:4]}-{mod_time[4:6]}-{mod_time[6:8]} {mod_time[8:10]}:{mod_time[10:12]}"
                 
-                if filename in ['.', '..']:
-                    continue
-                
-                file_type = "DIR" if is_dir else "FILE"
+                file_type = "DIR" if facts['type'] == 'dir' else "FILE"
                 print(f"{file_type:4} {file_size:>10} {mod_time:12} {filename}")
             
             print("-" * 80)
@@ -202,80 +1440,256 @@ class FTPClient:
             print(f"列出目录失败: {e}")
             return False
 
-    def download_file(self, remote_file: str, local_file: str) -> bool:
-
+    def download_file(self, remote_file: str, local_file: str, remote_size: int = None) -> bool:
+        """
+        下载单个文件，支持断点续传
+        
+        Args:
+            remote_file: 远程文件路径
+            local_file: 本地文件路径，为已存在的目录时下载到该目录中
+            remote_size: 调用方已知的远程文件大小（如来自MLSD），提供时不再查询服务器
+            
+        Returns:
+            bool: 下载是否成功
+        """
         try:
-            try:
-                remote_size = self.ftp.size(remote_file)
-                if remote_size is None:
+            if remote_size is None:
+                try:
+                    remote_stat = self.stat(remote_file, binary=True)
+                    if remote_stat is None or remote_stat['type'] != 'file':
+                        print(f"远程文件不存在: {remote_file}")
+                        return False
+                    remote_size = remote_stat['size']
+                    if remote_size is None:
+                        remote_size = self.ftp.size(remote_file)
+                        # 非213响应时ftplib返回None
+                        if remote_size is None:
+                            print(f"远程文件不存在: {remote_file}")
+                            return False
+                except:
                     print(f"远程文件不存在: {remote_file}")
                     return False
-            except:
-                print(f"远程文件不存在: {remote_file}")
-                return False
             
-            local_path = Path(local_file)
+            # 每个候选路径只stat一次
+            local_stat = self._local_stat(local_file)
+            if local_stat is not None and stat.S_ISDIR(local_stat.st_mode):
+                # 如果本地路径是目录，则将文件下载到该目录中
+                local_file = os.path.join(local_file, posixpath.basename(remote_file))
+                local_stat = self._local_stat(local_file)
             
-            local_size = 0
-            if local_path.exists():
-                if local_path.is_file():
-                    local_size = local_path.stat().st_size
-                    if local_size == remote_size:
+            # 数据先写入临时文件，完整后再改名为目标文件，目标路径上只会出现完整的文件
+            part_file = local_file + PART_SUFFIX
+            if local_stat is not None and stat.S_ISREG(local_stat.st_mode):
+                local_size = local_stat.st_size
+                if local_size == remote_size:
+                    if self.verbose:
                         print(f"文件已存在且完整: {local_file}")
-                        return True
-                    elif local_size < remote_size:
-                        print(f"发现未完成的下载，继续从 {local_size} 字节处下载")
-                        mode = 'ab'
-                        start_pos = local_size
-                    else:
-                        print(f"本地文件异常，重新下载")
-                        mode = 'wb'
-                        start_pos = 0
+                    return True
+                elif local_size > remote_size:
+                    print("本地文件异常，重新下载")
+                elif not os.path.lexists(part_file):
+                    # 旧版本直接写入目标文件时留下的未完成下载，转为临时文件继续
+                    os.replace(local_file, part_file)
+            
+            mode = 'wb'
+            start_pos = 0
+            part_stat = self._local_stat(part_file)
+            if part_stat is not None and stat.S_ISREG(part_stat.st_mode):
+                part_size = part_stat.st_size
+                # 与远程大小相同的临时文件可能是预分配后被强制中断留下的，不能信任
+                if part_size < remote_size:
+                    if self.verbose:
+                        print(f"发现未完成的下载，继续从 {part_size} 字节处下载")
+                    mode = 'ab'
+                    start_pos = part_size
                 else:
-                    # 如果本地路径是目录，则将文件下载到该目录中
-                    local_file = os.path.join(local_file, os.path.basename(remote_file))
-                    local_path = Path(local_file)
-                    if local_path.exists() and local_path.is_file():
-                        local_size = local_path.stat().st_size
-                        if local_size == remote_size:
-                            print(f"文件已存在且完整: {local_file}")
-                            return True
-                        elif local_size < remote_size:
-                            print(f"发现未完成的下载，继续从 {local_size} 字节处下载")
-                            mode = 'ab'
-                            start_pos = local_size
-                        else:
-                            print(f"本地文件异常，重新下载")
-                            mode = 'wb'
-                            start_pos = 0
-                    else:
-                        mode = 'wb'
-                        start_pos = 0
-            else:
+                    print("本地文件异常，重新下载")
+            
+            if start_pos and not self._has_feature('REST STREAM'):
+                print("服务器不支持断点续传，重新下载")
                 mode = 'wb'
                 start_pos = 0
             
-            local_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(local_file, mode) as f:
-                def callback(data):
-                    """下载进度回调函数"""
-                    nonlocal start_pos
-                    f.write(data)
-                    start_pos += len(data)
-                    progress = (start_pos / remote_size) * 100
-                    sys.stdout.write(f"\r下载进度: {progress:.1f}% ({start_pos}/{remote_size} bytes)")
-                    sys.stdout.flush()
+            # 本地文件已完整时上面已经返回，不会为其发送TYPE I
+            self._binary_mode()
+            os.makedirs(os.path.dirname(local_file) or '.', exist_ok=True)
+            
+            # 直接通过文件描述符写入，避免缓冲文件对象对每个数据块的额外拷贝；
+            # 续传时定位到文件末尾而不使用O_APPEND，以便splice写入
+            flags = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+            if mode == 'wb':
+                flags |= os.O_TRUNC
+            fd = os.open(part_file, flags, 0o644)
+            try:
+                os.lseek(fd, start_pos, os.SEEK_SET)
+                _fadvise(fd, 'POSIX_FADV_SEQUENTIAL')
+                preallocated = False
+                if start_pos == 0 and remote_size > 0 and hasattr(os, 'posix_fallocate'):
+                    # 按远程大小一次性分配磁盘空间，避免边写边扩展产生碎片
+                    try:
+                        os.posix_fallocate(fd, 0, remote_size)
+                        preallocated = True
+                    except OSError:
+                        pass
                 
-                self.ftp.retrbinary(f"RETR {remote_file}", callback, blocksize=8192, rest=start_pos)
+                with _ProgressReporter("下载进度", start_pos, remote_size, self.verbose) as progress:
+                    
+                    def callback(received):
+                        progress.done += received
+                    
+                    try:
+                        self._retrieve_file(remote_file, start_pos, fd, callback, remote_size - start_pos)
+                    finally:
+                        # 预分配使文件提前达到远程大小，未写满时截断到实际长度，以免续传时被误判为完整
+                        if preallocated and progress.done != remote_size:
+                            os.ftruncate(fd, progress.done)
+                os.fsync(fd)
+                # 数据已落盘，页缓存可以直接丢弃
+                _fadvise(fd, 'POSIX_FADV_DONTNEED')
+            finally:
+                os.close(fd)
+            os.replace(part_file, local_file)
             
-            print(f"\n文件下载成功: {remote_file} -> {local_file}")
+            if self.verbose:
+                print(f"\n文件下载成功: {remote_file} -> {local_file}")
             return True
             
         except Exception as e:
             print(f"\n文件下载失败: {e}")
             return False
     
+    @staticmethod
+    def _local_stat(path: str):
+        """
+        获取本地路径的stat结果
+        
+        Args:
+            path: 本地路径
+            
+        Returns:
+            os.stat_result: 路径不存在时返回None
+        """
+        try:
+            return os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+    
+    def _run_transfers(self, tasks, transfer) -> tuple:
+        """
+        执行一批文件传输，workers大于1时通过连接池并发执行
+        
+        tasks为生成器时边产生边传输：生成器在调用线程中运行（可以使用当前连接），
+        任务经有界队列交给各工作线程，内存占用与任务总数无关；
+        连接池中的连接不逐个文件输出信息，由后台线程汇总刷新已完成的文件数；
+        先取出前两个任务判断数量，只有一个任务时直接使用当前连接，不建立连接池。
+        服务器拒绝更多连接（如限制了单IP连接数）时，无法连接的工作线程退回任务后结束，
+        并发数收缩到实际建立的连接数；一个连接都无法建立时剩余任务使用当前连接传输
+        
+        Args:
+            tasks: 任务参数元组的列表或生成器
+            transfer: 传输函数，以 transfer(client, *task) 方式调用，返回是否成功
+            
+        Returns:
+            tuple: (传输成功的文件数, 文件总数)
+        """
+        tasks = iter(tasks)
+        head = list(itertools.islice(tasks, 2))
+        tasks = itertools.chain(head, tasks)
+        if self.workers <= 1 or len(head) <= 1:
+            success_count = total_count = 0
+            for task in tasks:
+                total_count += 1
+                if transfer(self, *task):
+                    success_count += 1
+            return success_count, total_count
+        
+        pool = FTPConnectionPool(self.host, self.username, self.password, self.encoding,
+                                 ensured_dirs=self._ensured_dirs, created_dirs=self._created_dirs,
+                                 server_state=self.server_state(),
+                                 tcp_buffer_size=self.tcp_buffer_size, backend=self.backend,
+                                 resume_threshold=self.resume_threshold, tls=self.tls,
+                                 skip_unchanged=self.skip_unchanged, blocksize=self.blocksize)
+        task_queue = queue.Queue(maxsize=TASK_QUEUE_SIZE)
+        state_lock = threading.Lock()
+        # 仍在运行的工作线程数，以及无法建立连接的线程退回的任务
+        running = [self.workers]
+        returned = []
+        
+        def worker(progress):
+            # 连接在取到第一个任务时才建立，任务少于线程数时多余的线程不会连接服务器
+            success_count = 0
+            while True:
+                with state_lock:
+                    task = returned.pop() if returned else None
+                if task is None:
+                    task = task_queue.get()
+                    if task is None:
+                        return success_count
+                try:
+                    with pool.connection() as client:
+                        if client is None:
+                            with state_lock:
+                                returned.append(task)
+                                running[0] -= 1
+                            return success_count
+                        if transfer(client, *task):
+                            success_count += 1
+                except Exception as e:
+                    print(f"\n并发传输失败: {e}")
+                with state_lock:
+                    progress.done += 1
+        
+        def put(item) -> bool:
+            # 所有工作线程都已结束时不再等待队列空位，返回False
+            while True:
+                with state_lock:
+                    if not running[0]:
+                        return False
+                try:
+                    task_queue.put(item, timeout=PROGRESS_INTERVAL)
+                    return True
+                except queue.Full:
+                    pass
+        
+        success_count = total_count = 0
+        leftover = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor, \
+                    _ProgressReporter("已完成文件", 0, None, self.verbose) as progress:
+                futures = [executor.submit(worker, progress) for _ in range(self.workers)]
+                try:
+                    for task in tasks:
+                        total_count += 1
+                        if not put(task):
+                            leftover.append(task)
+                            break
+                finally:
+                    for _ in futures:
+                        put(None)
+                success_count = sum(future.result() for future in futures)
+        finally:
+            pool.close()
+        
+        # 工作线程都已结束，收集未传输的任务：退回的任务、队列中剩余的任务和尚未产生的任务
+        leftover.extend(returned)
+        while True:
+            try:
+                task = task_queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                leftover.append(task)
+        total_count -= len(leftover)
+        pending = itertools.chain(leftover, tasks)
+        task = next(pending, None)
+        if task is not None:
+            print("\n无法建立足够的并发连接，剩余文件使用当前连接传输")
+            for task in itertools.chain([task], pending):
+                total_count += 1
+                if transfer(self, *task):
+                    success_count += 1
+        return success_count, total_count
+    
     def upload_directory(self, local_dir: str, remote_dir: str) -> bool:
         """
         上传整个目录到FTP服务器
@@ -293,32 +1707,63 @@ class FTPClient:
                 print(f"本地目录不存在: {local_dir}")
                 return False
             
+            # 目标目录（含各级父目录）与整棵子目录树在同一批命令中创建，
+            # 之后的ensure_remote_directory只会命中缓存；批量创建失败时由它重试并报告错误
+            self.ensure_remote_directories([remote_dir] + list(_walk_dirs(local_dir, remote_dir)))
             if not self.ensure_remote_directory(remote_dir):
                 return False
             
             print(f"开始上传目录: {local_dir} -> {remote_dir}")
             
-            success_count = 0
-            total_count = 0
+            def remote_files(remote_path):
+                # 已存在的远程目录用一次MLSD取得其中所有文件的大小和修改时间，
+                # 代替逐个文件的SIZE/MDTM探测；本次新建的目录为空，无需列出
+                if _abs_dir(remote_path) in self._created_dirs:
+                    return {}
+                if self._mlsd_supported is False:
+                    return None
+                try:
+                    entries = self._list(remote_path)
+                except ftplib.Error:
+                    return None
+                if not self._mlsd_supported:
+                    # 回退到LIST时没有可靠的修改时间，仍由upload_file逐个探测
+                    return None
+                return {name: facts for name, facts in entries if facts['type'] == 'file'}
             
-            for root, dirs, files in os.walk(local_dir):
-                relative_path = os.path.relpath(root, local_dir)
-                if relative_path == '.':
-                    relative_path = ''
-                
-                current_remote_dir = os.path.join(remote_dir, relative_path).replace('\\', '/')
-                
-                self.ensure_remote_directory(current_remote_dir)
-                
-                for file in files:
-                    local_file = os.path.join(root, file)
-                    remote_file = os.path.join(current_remote_dir, file).replace('\\', '/')
-                    
-                    total_count += 1
-                    print(f"\n[{total_count}] 上传文件: {file}")
-                    
-                    if self.upload_file(local_file, remote_file):
-                        success_count += 1
+            def walk_tasks():
+                # 边遍历本地目录边产生上传任务，远程目录在其中的文件入队之前创建；
+                # 目录条目之后紧跟该目录中的文件，远程列表在遇到第一个用得上它的文件时才获取：
+                # 未开启skip_unchanged时小文件直接整体上传，不需要远程大小，全是小文件的目录不必列出
+                resumable = self._has_feature('REST STREAM')
+                index = 0
+                current_dir = remote_dir
+                listing = None
+                listed = False
+                for local_file, remote_file, name, is_dir, local_stat in _walk_files(local_dir, remote_dir):
+                    if is_dir:
+                        self.ensure_remote_directory(remote_file)
+                        current_dir = remote_file
+                        listing = None
+                        listed = False
+                    else:
+                        if not listed and local_stat is not None and (self.skip_unchanged or (
+                                resumable and local_stat.st_size >= self.resume_threshold)):
+                            listing = remote_files(current_dir)
+                            listed = True
+                        remote_facts = None
+                        if listing is not None:
+                            remote_facts = listing.get(name, {})
+                        index += 1
+                        yield index, local_file, remote_file, name, local_stat, remote_facts
+            
+            def upload(client, index, local_file, remote_file, name, local_stat, remote_facts):
+                if client.verbose:
+                    print(f"\n[{index}] 上传文件: {name}")
+                return client.upload_file(local_file, remote_file, local_stat=local_stat,
+                                          remote_facts=remote_facts)
+            
+            success_count, total_count = self._run_transfers(walk_tasks(), upload)
             
             print(f"\n目录上传完成: {success_count}/{total_count} 个文件成功")
             return success_count == total_count
@@ -341,63 +1786,56 @@ class FTPClient:
         """
         try:
             try:
-                self.ftp.cwd(remote_dir)
+                self._chdir(remote_dir)
             except:
                 print(f"远程目录不存在: {remote_dir}")
                 return True
             
             print(f"开始下载目录: {remote_dir} -> {local_dir}")
             
-            success_count = 0
-            total_count = 0
-            
-            def download_recursive(current_remote_dir, current_local_dir, depth):
-                nonlocal success_count, total_count
-                
+            def walk_tasks(current_remote_dir, current_local_dir, depth):
+                # 边列目录边产生下载任务：并发传输时列目录的往返与已开始的下载重叠，
+                # 不必等整棵目录树列完才开始传输
                 if depth > max_depth:
                     print(f"警告: 达到最大递归深度 {max_depth}，停止下载")
                     return
                 
-                Path(current_local_dir).mkdir(parents=True, exist_ok=True)
+                os.makedirs(current_local_dir, exist_ok=True)
                 
+                files = []
+                subdirs = []
                 try:
-                    self.ftp.cwd(current_remote_dir)
-                    
-                    items = []
-                    self.ftp.retrlines('LIST', items.append)
-                    
-
-                    
-                    for item in items:
-                        parts = item.split()
-                        if len(parts) < 3:
-                            continue
-                        
-                        is_dir = parts[0].startswith('d') if parts[0] else False
-                        
-                        filename = ' '.join(parts[8:]) if len(parts) >= 9 else parts[-1]
-                        
-                        if filename in ['.', '..']:
-                            continue
-                        
-
-                        
-                        remote_path = os.path.join(current_remote_dir, filename).replace('\\', '/')
-                        local_path = os.path.join(current_local_dir, filename)
+                    # 路径前缀每个目录只计算一次，条目路径直接拼接
+                    remote_prefix = current_remote_dir.rstrip('/') + '/'
+                    local_prefix = os.path.join(current_local_dir, '')
+                    for filename, facts in self._list(current_remote_dir):
+                        is_dir = facts['type'] == 'dir'
+                        remote_path = remote_prefix + filename
+                        local_path = local_prefix + filename
                         
                         if is_dir:
-                            download_recursive(remote_path, local_path, depth + 1)
+                            subdirs.append((remote_path, local_path))
                         else:
-                            total_count += 1
-                            if self.download_file(remote_path, local_path):
-                                success_count += 1
+                            # 列表中已带有文件大小，下载时无需再向服务器查询
+                            size = facts.get('size')
+                            size = int(size) if size and size.isdigit() else None
+                            files.append((remote_path, local_path, size))
                 
                 except Exception as e:
                     print(f"获取目录列表失败: {e}")
                     import traceback
                     print(f"详细错误: {traceback.format_exc()}")
+                
+                # 同一目录中大文件先开始，小文件填补各连接的空闲
+                files.sort(key=lambda task: task[2] or 0, reverse=True)
+                yield from files
+                for remote_path, local_path in subdirs:
+                    yield from walk_tasks(remote_path, local_path, depth + 1)
+            
+            def download(client, remote_file, local_file, remote_size):
+                return client.download_file(remote_file, local_file, remote_size)
             
-            download_recursive(remote_dir, local_dir, 0)
+            success_count, total_count = self._run_transfers(walk_tasks(remote_dir, local_dir, 0), download)
             
             print(f"\n目录下载完成: {success_count}/{total_count} 个文件成功")
             return success_count == total_count
@@ -413,69 +1851,66 @@ class FTPClient:
         Args:
             remote_dir: 远程目录路径
             max_depth: 最大递归深度
-            current_depth: 当前递归深度
+            current_depth: 起始目录的深度
             
         Returns:
             bool: 显示是否成功
         """
         try:
-            if current_depth > max_depth:
-                print(f"  {'  ' * current_depth}└── [达到最大深度 {max_depth}]")
-                return True
-            
-            try:
-                self.ftp.cwd(remote_dir)
-            except:
-                print(f"远程目录不存在: {remote_dir}")
-                return True
-            
-            items = []
-            self.ftp.retrlines('LIST', items.append)
-            
-            if not items:
-                print(f"  {'  ' * current_depth}└── (空目录)")
-                return True
-            
-            # 显示当前目录
-            if current_depth == 0:
-                print(f"{remote_dir}/")
-            else:
-                dir_name = os.path.basename(remote_dir.rstrip('/'))
-                print(f"  {'  ' * (current_depth - 1)}├── {dir_name}/")
-            
-            dirs = []
-            files = []
-            
-            for item in items:
-                parts = item.split()
-                if len(parts) < 3:
+            # 用显式栈代替递归，栈中元素为待输出的行或待展开的(目录, 深度)
+            stack = [(remote_dir, current_depth)]
+            while stack:
+                item = stack.pop()
+                if isinstance(item, str):
+                    print(item)
                     continue
                 
-                is_dir = parts[0].startswith('d') if parts[0] else False
-                filename = ' '.join(parts[8:]) if len(parts) >= 9 else parts[-1]
+                path, depth = item
+                if depth > max_depth:
+                    print(f"  {'  ' * depth}└── [达到最大深度 {max_depth}]")
+                    continue
+                
+                # 直接列出目标路径，无需先CWD
+                try:
+                    entries = self._list(path)
+                except ftplib.error_perm:
+                    print(f"远程目录不存在: {path}")
+                    continue
                 
-                if filename in ['.', '..']:
+                if not entries:
+                    print(f"  {'  ' * depth}└── (空目录)")
                     continue
                 
-                if is_dir:
-                    dirs.append(filename)
+                # 显示当前目录
+                if depth == 0:
+                    print(f"{path}/")
                 else:
-                    files.append(filename)
-            
-            # 先显示文件
-            for i, file in enumerate(sorted(files)):
-                is_last_file = i == len(files) - 1 and not dirs
-                prefix = "  " + ("  " * current_depth) + ("└── " if is_last_file else "├── ")
-                print(f"{prefix}{file}")
-            
-            # 再递归显示目录
-            for i, directory in enumerate(sorted(dirs)):
-                is_last_dir = i == len(dirs) - 1
-                prefix = "  " + ("  " * current_depth) + ("└── " if is_last_dir else "├── ")
-                print(f"{prefix}{directory}/")
+                    dir_name = posixpath.basename(path.rstrip('/'))
+                    print(f"  {'  ' * (depth - 1)}├── {dir_name}/")
                 
-                sub_remote_dir = os.path.join(remote_dir, directory).replace('\\', '/')
-                self.tree_directory(sub_remote_dir, max_depth, current_depth + 1)
+                dirs = []
+                files = []
+                
+                for filename, facts in entries:
+                    if facts['type'] == 'dir':
+                        dirs.append(filename)
+                    else:
+                        files.append(filename)
+                
+                # 先显示文件
+                indent = "  " + ("  " * depth)
+                for i, file in enumerate(sorted(files)):
+                    is_last_file = i == len(files) - 1 and not dirs
+                    print(f"{indent}{'└── ' if is_last_file else '├── '}{file}")
+                
+                # 再按顺序展开子目录，逆序入栈以保证出栈顺序
+                children = []
+                path_prefix = path.rstrip('/') + '/'
+                for i, directory in enumerate(sorted(dirs)):
+                    is_last_dir = i == len(dirs) - 1
+                    children.append(f"{indent}{'└── ' if is_last_dir else '├── '}{directory}/")
+                    children.append((path_prefix + directory, depth + 1))
+                stack.extend(reversed(children))
             
             return True
             
@@ -486,6 +1921,79 @@ class FTPClient:
             return False
 
 
+class FTPConnectionPool:
+    """FTP连接池，按需建立连接并在并发传输的工作线程间复用"""
+    
+    def __init__(self, host: str, username: str, password: str, encoding: str = 'gbk',
+                 ensured_dirs: set = None, created_dirs: set = None, server_state: dict = None,
+                 **client_options):
+        """
+        初始化FTP连接池
+        
+        Args:
+            host: FTP服务器地址
+            username: FTP用户名
+            password: FTP密码
+            encoding: FTP连接编码，默认为'gbk'
+            ensured_dirs: 各连接共享的已确认存在的远程目录集合
+            created_dirs: 各连接共享的本次会话新建的远程目录集合
+            server_state: 已探测到的服务器特性，新建连接时沿用而不再发送FEAT
+            client_options: 创建FTPClient时传入的其他参数
+        """
+        self.host = host
+        self.username = username
+        self.password = password
+        self.encoding = encoding
+        self.ensured_dirs = ensured_dirs if ensured_dirs is not None else set()
+        self.created_dirs = created_dirs if created_dirs is not None else set()
+        self.server_state = server_state
+        self.client_options = client_options
+        self._idle = []
+        self._clients = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def connection(self):
+        """
+        取出一个空闲连接，没有空闲连接时新建，使用完毕后放回连接池
+        
+        使用期间抛出异常的连接状态未知，直接断开而不放回连接池
+        
+        Yields:
+            FTPClient: 已登录的FTP客户端，无法建立新连接时为None
+        """
+        with self._lock:
+            client = self._idle.pop() if self._idle else None
+        
+        if client is None:
+            client = FTPClient(self.host, self.username, self.password, self.encoding,
+                               workers=1, verbose=False, **self.client_options)
+            if not client.connect(self.server_state):
+                yield None
+                return
+            client._ensured_dirs = self.ensured_dirs
+            client._created_dirs = self.created_dirs
+            with self._lock:
+                self._clients.append(client)
+        
+        try:
+            yield client
+        except BaseException:
+            with self._lock:
+                self._clients.remove(client)
+            client.disconnect()
+            raise
+        with self._lock:
+            self._idle.append(client)
+    
+    def close(self):
+        """断开连接池中的所有连接"""
+        with self._lock:
+            clients, self._clients, self._idle = self._clients, [], []
+        for client in clients:
+            client.disconnect()
+
+
 def load_config(path="config.json"):
     """
     从config.json文件加载配置
@@ -529,7 +2037,13 @@ def main():
     parser.add_argument('--host', default=FTP_HOST, help=f'FTP服务器地址（默认: {FTP_HOST}）')
     parser.add_argument('--user', default=FTP_USER, help=f'FTP用户名（默认: {FTP_USER}）')
     parser.add_argument('--pass', dest='password', default=FTP_PASS, help=f'FTP密码（默认: {FTP_PASS}）')
-    parser.add_argument('--encoding', default=FTP_ENCODING, help=f'FTP连接编码（默认: {FTP_ENCODING}）')
+    parser.add_argument('--encoding', default=FTP_ENCODING, help=f'FTP连接编码，auto表示服务器支持时使用UTF-8（默认: {FTP_ENCODING}）')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'目录传输的并发连接数（默认: {DEFAULT_WORKERS}）')
+    parser.add_argument('--tls', action='store_true', help='使用显式FTPS（AUTH TLS）加密传输')
+    parser.add_argument('--backend', choices=['ftplib', 'pycurl'], default='ftplib', help='文件数据的传输实现，pycurl需额外安装（默认: ftplib）')
+    parser.add_argument('--skip-unchanged', action='store_true', help='上传时跳过远程大小相同且修改时间不早于本地的文件')
+    parser.add_argument('--tcp-buffer', type=int, default=DEFAULT_TCP_BUFFER_SIZE, help='数据连接的TCP收发缓冲区大小，单位字节，0表示由系统自动调节（默认: 0）')
+    parser.add_argument('--blocksize', type=int, default=BLOCKSIZE, help=f'数据连接每次读写的块大小，单位字节（默认: {BLOCKSIZE}）')
     parser.add_argument('-v', '--version', action='store_true', help='显示版本信息')
     
     args = parser.parse_args()
@@ -539,6 +2053,11 @@ def main():
         print(f"FTP文件传输工具 v{VERSION}")
         sys.exit(0)
     
+    if args.blocksize <= 0:
+        parser.error('--blocksize必须大于0')
+    if args.tcp_buffer < 0:
+        parser.error('--tcp-buffer不能小于0')
+    
     # 检查是否有操作参数
     has_action = bool(args.put or args.get or args.ls or args.tree)
     if not has_action:
@@ -567,7 +2086,7 @@ def main():
         if args.remote.startswith('/'):
             remote_path = args.remote
         else:
-            remote_path = os.path.join(FTP_PATH, args.remote).replace('\\', '/')
+            remote_path = posixpath.join(FTP_PATH, args.remote.replace('\\', '/'))
     else:
         remote_path = FTP_PATH
     
@@ -584,7 +2103,7 @@ def main():
         if args.remote.startswith('/'):
             remote_path = args.remote
         else:
-            remote_path = os.path.join(FTP_PATH, args.remote).replace('\\', '/')
+            remote_path = posixpath.join(FTP_PATH, args.remote.replace('\\', '/'))
     
     # 处理新的参数格式：--ls 后直接跟远程路径
     if args.ls and args.ls is not True:
@@ -594,7 +2113,7 @@ def main():
         if args.remote.startswith('/'):
             remote_path = args.remote
         else:
-            remote_path = os.path.join(FTP_PATH, args.remote).replace('\\', '/')
+            remote_path = posixpath.join(FTP_PATH, args.remote.replace('\\', '/'))
     
     # 处理新的参数格式：--tree 后直接跟远程路径
     if args.tree and args.tree is not True:
@@ -604,9 +2123,11 @@ def main():
         if args.remote.startswith('/'):
             remote_path = args.remote
         else:
-            remote_path = os.path.join(FTP_PATH, args.remote).replace('\\', '/')
+            remote_path = posixpath.join(FTP_PATH, args.remote.replace('\\', '/'))
     
-    ftp_client = FTPClient(args.host, args.user, args.password, args.encoding)
+    ftp_client = FTPClient(args.host, args.user, args.password, args.encoding, workers=args.workers,
+                           backend=args.backend, tls=args.tls, skip_unchanged=args.skip_unchanged,
+                           blocksize=args.blocksize, tcp_buffer_size=args.tcp_buffer)
     
     try:
         if not ftp_client.connect():
@@ -622,7 +2143,9 @@ def main():
                 success = False
             else:
                 local_path = Path(args.local)
-                if local_path.is_file():
+                # 只stat一次，判断类型和上传时都使用同一结果
+                local_stat = ftp_client._local_stat(args.local)
+                if local_stat is not None and stat.S_ISREG(local_stat.st_mode):
                     # 如果远程路径以/结尾，表示要在该目录下创建文件
                     if remote_path.endswith('/'):
                         # 确保目录存在
@@ -630,26 +2153,23 @@ def main():
                         if not ftp_client.ensure_remote_directory(remote_dir):
                             success = False
                         else:
-                            remote_file = os.path.join(remote_dir, local_path.name).replace('\\', '/')
-                            success = ftp_client.upload_file(args.local, remote_file)
+                            remote_file = posixpath.join(remote_dir, local_path.name)
+                            success = ftp_client.upload_file(args.local, remote_file, local_stat)
                     else:
                         # 如果远程路径是目录路径（以/结尾），则使用本地文件名
                         if remote_path == FTP_PATH or remote_path.endswith('/'):
-                            remote_file = os.path.join(remote_path, local_path.name).replace('\\', '/')
-                            success = ftp_client.upload_file(args.local, remote_file)
+                            remote_file = posixpath.join(remote_path, local_path.name)
+                            success = ftp_client.upload_file(args.local, remote_file, local_stat)
                         else:
                             # 直接使用指定的远程路径（重命名文件）
-                            success = ftp_client.upload_file(args.local, remote_path)
-                elif local_path.is_dir():
+                            success = ftp_client.upload_file(args.local, remote_path, local_stat)
+                elif local_stat is not None and stat.S_ISDIR(local_stat.st_mode):
                     # 如果远程路径以/结尾，表示要在该目录下创建子目录
                     if remote_path.endswith('/'):
-                        # 确保父目录存在
+                        # 父目录由upload_directory与目标目录一起批量创建
                         remote_parent_dir = remote_path.rstrip('/')
-                        if not ftp_client.ensure_remote_directory(remote_parent_dir):
-                            success = False
-                        else:
-                            remote_dir = os.path.join(remote_parent_dir, local_path.name).replace('\\', '/')
-                            success = ftp_client.upload_directory(args.local, remote_dir)
+                        remote_dir = posixpath.join(remote_parent_dir, local_path.name)
+                        success = ftp_client.upload_directory(args.local, remote_dir)
                     else:
                         # 直接使用指定的远程路径（重命名目录）
                         success = ftp_client.upload_directory(args.local, remote_path)
@@ -667,25 +2187,20 @@ def main():
                 else:
                     local_path = Path(".")
                 
-                # 使用更可靠的方法判断文件/目录类型
-                # 尝试切换到该路径，如果能切换成功说明是目录
+                # 判断远程路径是文件还是目录
                 try:
-                    ftp_client.ftp.cwd(remote_path)
-                    is_file = False  # 能切换到该路径，说明是目录
-                    ftp_client.ftp.cwd('/')  # 切换回根目录
-                    print(f"DEBUG: 路径 {remote_path} 是目录")
-                except:
-                    # 不能切换，可能是文件或不存在的路径
-                    # 尝试获取文件大小来判断是否是文件
-                    try:
-                        ftp_client.ftp.size(remote_path)
-                        is_file = True  # 能获取文件大小，说明是文件
-                        print(f"DEBUG: 路径 {remote_path} 是文件")
-                    except:
-                        # 既不能切换目录也不能获取文件大小，说明路径不存在
-                        print(f"错误: 远程路径不存在: {remote_path}")
-                        success = False
-                        is_file = None  # 标记为无效路径
+                    remote_stat = ftp_client.stat(remote_path)
+                except Exception:
+                    remote_stat = None
+                
+                if remote_stat is None:
+                    # 路径不存在
+                    print(f"错误: 远程路径不存在: {remote_path}")
+                    success = False
+                    is_file = None  # 标记为无效路径
+                else:
+                    is_file = remote_stat['type'] == 'file'
+                    print(f"DEBUG: 路径 {remote_path} 是{'文件' if is_file else '目录'}")
                 
                 if is_file:
                     if args.local:
@@ -693,25 +2208,26 @@ def main():
                         if args.local.endswith('/'):
                             # 创建目录并下载文件到该目录
                             os.makedirs(args.local, exist_ok=True)
-                            local_file = os.path.join(args.local, os.path.basename(remote_path))
+                            local_file = os.path.join(args.local, posixpath.basename(remote_path))
                         else:
                             # 直接使用指定的本地路径（重命名文件）
                             local_file = args.local
                     else:
-                        local_file = os.path.basename(remote_path)
-                    success = ftp_client.download_file(remote_path, local_file)
+                        local_file = posixpath.basename(remote_path)
+                    # 判断类型时已取得文件大小，下载时无需再查询
+                    success = ftp_client.download_file(remote_path, local_file, remote_stat['size'])
                 else:
                     if args.local:
                         # 如果本地路径以/结尾，表示要创建目录并下载到该目录
                         if args.local.endswith('/'):
                             # 创建目录并下载目录内容到该目录
                             os.makedirs(args.local, exist_ok=True)
-                            local_dir = os.path.join(args.local, os.path.basename(remote_path))
+                            local_dir = os.path.join(args.local, posixpath.basename(remote_path))
                         else:
                             # 直接使用指定的本地路径（重命名目录）
                             local_dir = args.local
                     else:
-                        local_dir = os.path.basename(remote_path) or "downloaded"
+                        local_dir = posixpath.basename(remote_path) or "downloaded"
                     success = ftp_client.download_directory(remote_path, local_dir)
         
         sys.exit(0 if success else 1)